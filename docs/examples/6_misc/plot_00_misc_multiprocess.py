@@ -98,5 +98,12 @@ time_func (
     nl.apply, my_func, parallel=True
 )
 
+# %%
+# By default, [`NeuronList.apply`][navis.NeuronList.apply] uses multiple processes. Starting the processes and
+# copying the neurons to them has some overhead. If your function spends most of its time in code that releases
+# Python's GIL (e.g. most `numpy`/`scipy` operations or waiting for I/O like our mock function), you can use
+# threads instead:
 
-
+time_func (
+    nl.apply, my_func, parallel=True, parallel_backend='thread'
+)
@@ -476,42 +476,40 @@ def neuron2voxels(x: 'core.BaseNeuron',
     alph = np.zeros(grid.shape, dtype=np.float32)
 
     # Get unique voxels
-    uni, inv = np.unique(ix, axis=0, return_inverse=True)
+    uni, first, inv = np.unique(ix, axis=0, return_index=True,
+                                return_inverse=True)
+    inv = inv.reshape(-1)
+    n_pts = np.bincount(inv)
 
-    # Go over each voxel
-    for i in range(len(uni)):
-        # Get points in this voxel
-        pt = pts[inv == i]
+    # Shift points by the first point in their voxel - this does not change
+    # the inertia but avoids loss of precision
+    cpt = np.subtract(pts, pts[first][inv], dtype=np.float64)
 
-        # Reshape
-        pt = pt.reshape(1, -1, 3)
+    # Instead of going over each voxel, we accumulate the unique entries of
+    # the (symmetric) inertia matrices for all voxels at once:
+    # sum(p * p.T) - sum(p) * sum(p).T / n
+    sums = [np.bincount(inv, weights=cpt[:, d]) for d in range(3)]
+    inertia = [np.bincount(inv, weights=cpt[:, a] * cpt[:, b])
+               - sums[a] * sums[b] / n_pts
+               for a, b in ((0, 0), (1, 1), (2, 2), (0, 1), (0, 2), (1, 2))]
 
-        # Generate centers for each cloud of k nearest neighbors
-        centers = np.mean(pt, axis=1)
+    # Extract vector and alpha
+    vect, alpha = core.core_utils._eig3_sym(*inertia, dtype=np.float32)
 
-        # Generate vector from center
-        cpt = pt - centers.reshape((pt.shape[0], 1, 3))
+    # No alpha if only one point
+    alpha[n_pts == 1] = 0
 
-        # Get inertia (N, 3, 3)
-        inertia = cpt.transpose((0, 2, 1)) @ cpt
-
-        # Extract vector and alpha
-        u, s, vh = np.linalg.svd(inertia)
-        vect = vh[:, 0, :]
-
-        # No alpha if only one point
-        if pt.shape[1] > 1:
-            alpha = (s[:, 0] - s[:, 1]) / np.sum(s, axis=1)
-        else:
-            alpha = [0]
+    # Drop voxels outside the defined bounds
+    is_in = np.all((uni >= 0) & (uni < shape), axis=1)
+    uni, vect, alpha = uni[is_in], vect[is_in], alpha[is_in]
 
-        vects[uni[i][0], uni[i][1], uni[i][2]] = vect.flatten()
-        alph[uni[i][0], uni[i][1], uni[i][2]] = alpha[0]
+    vects[uni[:, 0], uni[:, 1], uni[:, 2]] = vect
+    alph[uni[:, 0], uni[:, 1], uni[:, 2]] = alpha
 
     if vectors:
         n.vectors = vects
-    if alpha:
-        n.alphas = alpha
+    if alphas:
+        n.alphas = alph
 
     return n
 
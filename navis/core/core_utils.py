@@ -12,14 +12,18 @@
 #    GNU General Public License for more details.
 
 import functools
+import hashlib
 import numbers
 import os
 import pint
+import threading
+import weakref
 
 import pandas as pd
 import numpy as np
 import trimesh as tm
 
+from concurrent.futures import ThreadPoolExecutor
 from scipy.spatial import cKDTree
 from typing import Union, Sequence, Optional, Callable
 from typing_extensions import Literal
@@ -27,6 +31,21 @@ from typing_extensions import Literal
 from .. import config, graph, utils, core
 
 
+try:
+    from pykdtree.kdtree import KDTree as pyKDTree
+except ImportError:
+    pyKDTree = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 try:
     #from pathos.multiprocessing import ProcessingPool
     # pathos' ProcessingPool apparently ignores chunksize
@@ -41,6 +60,15 @@ __all__ = ['make_dotprops', 'to_neuron_space']
 # Set up logging
 logger = config.get_logger(__name__)
 
+# Cache for KDTrees used by `make_dotprops`: {neuron: (checksum, tree)}
+# Neurons are weakly referenced, i.e. trees are dropped with their neuron
+_KDTREE_CACHE = weakref.WeakKeyDictionary()
+_KDTREE_CACHE_SIZE = 100
+_KDTREE_CACHE_LOCK = threading.Lock()
+
+# Guards changes to the size of the candidate list of (shared) HNSW indices
+_HNSW_EF_LOCK = threading.Lock()
+
 
 def temp_property(func):
     """Check if neuron is stale. Clear cached temporary attributes if it is."""
@@ -55,13 +83,27 @@ def temp_property(func):
     return wrapper
 
 
-@utils.map_neuronlist(desc='Dotprops', allow_parallel=True)
+# Note: the heavy lifting (KDTree query, numpy) releases the GIL, so we can
+# use threads instead of processes when processing neurons in parallel
+@utils.map_neuronlist(desc='Dotprops', allow_parallel=True, backend='thread',
+                      must_zip=['tree'])
 def make_dotprops(x: Union[pd.DataFrame, np.ndarray,
                            'core.TreeNeuron', 'core.MeshNeuron',
                            'core.VoxelNeuron', 'core.NeuronList'],
                   k: int = 20,
                   resample: Union[float, int, bool, str] = False,
-                  threshold: float = None) -> Union['core.Dotprops', 'core.NeuronList']:
+                  threshold: float = None,
+                  workers: int = -1,
+                  kdtree_backend: Union[Literal['auto'],
+                                        Literal['scipy'],
+                                        Literal['pykdtree'],
+                                        Literal['hnsw']] = 'auto',
+                  device: Union[Literal['cpu'],
+                                Literal['cuda']] = 'cpu',
+                  dtype: Optional[Union[str, type]] = np.float32,
+                  tree: Optional[object] = None,
+                  cache_tree: bool = False
+                  ) -> Union['core.Dotprops', 'core.NeuronList']:
     """Produce dotprops from neurons or x/y/z points.
 
     This is following the implementation in R's `nat` library.
@@ -98,6 +140,52 @@ def make_dotprops(x: Union[pd.DataFrame, np.ndarray,
     threshold : float, optional
                 Only for `VoxelNeurons`: determines which voxels will be
                 converted to dotprops points.
+    workers :   int, optional
+                Number of threads used for the nearest-neighbour query (and
+                for building the HNSW index). `-1` (default) uses all
+                available cores. When processing a NeuronList with
+                `parallel=True`, this defaults to 1 to avoid oversubscribing
+                cores. Ignored if using `pykdtree` which instead respects the
+                `OMP_NUM_THREADS` environment variable.
+    kdtree_backend : "auto" | "scipy" | "pykdtree" | "hnsw"
+                Which KDTree implementation to use for the nearest-neighbour
+                query. `pykdtree` is typically 2-5x faster than scipy's
+                `cKDTree`. "auto" (default) will use `pykdtree` if it is
+                installed and fall back to scipy otherwise (or if `workers`
+                is set to anything but -1). "hnsw" uses an *approximate*
+                nearest-neighbour search (requires `hnswlib`) which will
+                occasionally miss a true neighbour (typically <1%). Tangent
+                vectors are fairly robust to that but results will not be
+                identical to the exact backends.
+                Note that in three dimensions KDTrees are hard to beat:
+                building the HNSW index is costly and it only pays off for
+                very large point clouds on machines with many cores -
+                benchmark before using it.
+    device :    "cpu" | "cuda"
+                If "cuda", will run the nearest-neighbour query and the
+                tangent vector calculation on the GPU. Requires `cupy` and
+                only makes sense for very large point clouds (millions of
+                points). `workers` and `kdtree_backend` are ignored.
+    dtype :     numpy dtype | None
+                Precision for the dotprops' points, vectors and alpha values.
+                Defaults to single precision (float32) which halves the memory
+                footprint compared to float64 and speeds up the calculation.
+                This is more than enough for NBLAST but note that float32 only
+                has ~7 significant digits, i.e. coordinates in the
+                range of 1,000,000 (e.g. in nanometers) will be rounded to
+                ~0.1. Set to `None` to keep the precision of the input data.
+    tree :      cKDTree | pykdtree.kdtree.KDTree | hnswlib.Index, optional
+                A pre-computed KDTree for the points. Must have been generated
+                from exactly the points used for the dotprops, i.e. after
+                resampling, dropping NaNs and casting to `dtype`. For
+                NeuronLists, provide one tree per neuron. If not provided,
+                we will build a new tree.
+    cache_tree : bool
+                If True and the input is a neuron, will cache the KDTree (for
+                as long as the neuron exists) such that repeated calls (e.g.
+                with different `k`) can reuse it. Note that this keeps the
+                tree in memory, so only use this if you plan to generate
+                dotprops for the same neuron(s) more than once.
 
     Returns
     -------
@@ -126,12 +214,25 @@ def make_dotprops(x: Union[pd.DataFrame, np.ndarray,
 
     utils.eval_param(resample, name='resample',
                      allowed_types=(numbers.Number, type(None), str))
+    utils.eval_param(kdtree_backend, name='kdtree_backend',
+                     allowed_values=('auto', 'scipy', 'pykdtree', 'hnsw'))
+    utils.eval_param(device, name='device', allowed_values=('cpu', 'cuda'))
+
+    # pykdtree always uses all (OpenMP) threads - if the number of workers
+    # is restricted we have to fall back to scipy
+    if kdtree_backend == 'auto' and workers != -1:
+        kdtree_backend = 'scipy'
+
+    # Keep track of the original neuron (if any) for the KDTree cache
+    neuron = x if isinstance(x, core.BaseNeuron) else None
+    # Keep track of the input array (if any) so we don't return a view of it
+    source = x if isinstance(x, np.ndarray) else None
 
     properties = {}
     if isinstance(x, pd.DataFrame):
         if not all(np.isin(['x', 'y', 'z'], x.columns)):
             raise ValueError('DataFrame must contain "x", "y" and "z" columns.')
-        x = x[['x', 'y', 'z']].values
+        x = _xyz_to_numpy(x)
     elif isinstance(x, core.TreeNeuron):
         if resample:
             x = x.resample(resample_to=resample, inplace=False)
@@ -139,18 +240,21 @@ def make_dotprops(x: Union[pd.DataFrame, np.ndarray,
 
         if isinstance(k, type(None)) or k <= 0:
             points, vect, length = graph.neuron2tangents(x)
+            if dtype is not None:
+                points = points.astype(dtype, copy=False)
+                vect = vect.astype(dtype, copy=False)
             return core.Dotprops(points=points, vect=vect, length=length, alpha=None,
                                  k=None, **properties)
 
-        x = x.nodes[['x', 'y', 'z']].values
+        x = _xyz_to_numpy(x.nodes)
     elif isinstance(x, core.MeshNeuron):
         properties.update({'units': x.units, 'name': x.name, 'id': x.id})
-        x = x.vertices
+        x = source = x.vertices
         if resample:
             x, _ = tm.points.remove_close(x, resample)
     elif isinstance(x, core.Dotprops):
         properties.update({'units': x.units, 'name': x.name, 'id': x.id})
-        x = x.points
+        x = source = x.points
         if resample:
             x, _ = tm.points.remove_close(x, resample)
     elif isinstance(x, core.VoxelNeuron):
@@ -179,8 +283,16 @@ def make_dotprops(x: Union[pd.DataFrame, np.ndarray,
         raise ValueError('`k` must be > 0 when converting non-TreeNeurons to '
                          'Dotprops.')
 
-    # Drop rows with NAs
-    x = x[~np.any(np.isnan(x), axis=1)]
+    # Drop rows with NAs - but skip the masking pass if there aren't any
+    is_nan = np.isnan(x[:, 0]) | np.isnan(x[:, 1]) | np.isnan(x[:, 2])
+    if is_nan.any():
+        x = x[~is_nan]
+
+    # Make sure points are contiguous and have the requested precision
+    x = np.ascontiguousarray(x, dtype=dtype)
+    # The dotprops must own their points and not share them with the input
+    if source is not None and np.may_share_memory(x, source):
+        x = x.copy()
 
     # Checks and balances
     n_points = x.shape[0]
@@ -190,30 +302,326 @@ def make_dotprops(x: Union[pd.DataFrame, np.ndarray,
 
     properties['k'] = k
 
-    # Create the KDTree and get the k-nearest neighbors for each point
-    tree = cKDTree(x)
-    dist, ix = tree.query(x, k=k)
+    if device == 'cuda':
+        vect, alpha = _dotprops_cuda(x, k=k)
+        return core.Dotprops(points=x, alpha=alpha, vect=vect, **properties)
+
+    # Get the k-nearest neighbors for each point
+    if tree is None and neuron is not None and cache_tree:
+        tree = _cached_kdtree(neuron, x, backend=kdtree_backend,
+                              workers=workers)
+    ix = _knn(x, k=k, workers=workers, backend=kdtree_backend, tree=tree)
+
+    # Get the (unique entries of the) inertia for each point's neighbourhood
+    inertia = _inertia_fused(x, ix)
+
+    # Extract vector and alpha
+    vect, alpha = _eig3_sym(*inertia, dtype=np.result_type(x, np.float32))
+
+    return core.Dotprops(points=x, alpha=alpha, vect=vect, **properties)
+
+
+def _xyz_to_numpy(df: pd.DataFrame) -> np.ndarray:
+    """Extract (N, 3) array of x/y/z coordinates from DataFrame.
+
+    Compared to `df[['x', 'y', 'z']].values` this avoids generating an
+    intermediate DataFrame and only touches the three columns we need.
+    """
+    return np.column_stack([df[c].to_numpy(copy=False) for c in ('x', 'y', 'z')])
+
+
+def _dotprops_cuda(x: np.ndarray, k: int) -> tuple:
+    """Calculate tangent vectors and alpha on the GPU.
+
+    All intermediate arrays stay in device memory and only the final vectors
+    and alpha values are copied back.
+
+    """
+    try:
+        import cupy as cp
+        from cupyx.scipy.spatial import KDTree as cuKDTree
+    except ImportError:
+        raise ImportError('`device="cuda"` requires cupy:\n'
+                          '  pip3 install cupy-cuda12x\n'
+                          'See https://docs.cupy.dev/en/stable/install.html '
+                          'for details.')
+
+    dtype = np.result_type(x, np.float32)
+    x_dev = cp.asarray(x, dtype=dtype)
+
+    # Get the k-nearest neighbors for each point
+    _, ix = cuKDTree(x_dev).query(x_dev, k=k)
+    ix = ix.reshape(x_dev.shape[0], k)
+
+    # Get centered points: array of (N, k, 3)
+    pt = cp.take(x_dev, ix, axis=0)
+    pt -= pt.mean(axis=1, keepdims=True)
+
+    # Get inertia (N, 3, 3) and its eigendecomposition (ascending order)
+    inertia = cp.einsum('nkd,nke->nde', pt, pt)
+    w, v = cp.linalg.eigh(inertia)
+    w = cp.maximum(w, 0)
+
+    vect = v[:, :, -1]
+    alpha = (w[:, 2] - w[:, 1]) / w.sum(axis=1)
+
+    return cp.asnumpy(vect), cp.asnumpy(alpha)
+
+
+def _build_kdtree(x: np.ndarray,
+                  backend: Union[Literal['auto'],
+                                 Literal['scipy'],
+                                 Literal['pykdtree'],
+                                 Literal['hnsw']] = 'auto',
+                  workers: int = -1):
+    """Build KDTree for given points using the given backend."""
+    if backend == 'auto':
+        backend = 'pykdtree' if pyKDTree else 'scipy'
+
+    if backend == 'hnsw':
+        if not hnswlib:
+            raise ImportError('`kdtree_backend="hnsw"` requires hnswlib:'
+                              '\n  pip3 install hnswlib')
+        # Not strictly a KDTree but a graph index for approximate neighbours
+        index = hnswlib.Index(space='l2', dim=3)
+        index.init_index(max_elements=x.shape[0], ef_construction=100, M=16)
+        index.add_items(x, num_threads=workers)
+        # The size of the candidate list trades speed for recall - note that
+        # `_knn` will increase it if necessary
+        index.set_ef(50)
+        return index
+
+    if backend == 'pykdtree':
+        if not pyKDTree:
+            raise ImportError('`kdtree_backend="pykdtree"` requires pykdtree:'
+                              '\n  pip3 install pykdtree')
+        # pykdtree only works with float32 or float64 arrays
+        if x.dtype not in (np.float32, np.float64):
+            x = x.astype(np.float64)
+        return pyKDTree(x)
+
+    # Note: skipping the balancing/compacting makes building the tree a
+    # lot faster and has little impact on query times for our inputs
+    return cKDTree(x, balanced_tree=False, compact_nodes=False)
+
+
+def _cached_kdtree(neuron: 'core.BaseNeuron',
+                   x: np.ndarray,
+                   backend: str = 'auto',
+                   workers: int = -1):
+    """Get KDTree for the neuron's points from cache or build a new one."""
+    data = np.ascontiguousarray(x)
+    if xxhash:
+        checksum = xxhash.xxh128(data).hexdigest()
+    else:
+        checksum = hashlib.md5(data).hexdigest()
+    # The backend and dtype also need to match
+    checksum = (checksum, backend, str(x.dtype))
+
+    with _KDTREE_CACHE_LOCK:
+        cached = _KDTREE_CACHE.get(neuron, None)
+    if cached and cached[0] == checksum:
+        return cached[1]
+
+    # Some backends keep a reference to (instead of a copy of) the points
+    # which also end up in the dotprops -> use a private copy for the cache
+    tree = _build_kdtree(x.copy(), backend=backend, workers=workers)
+
+    with _KDTREE_CACHE_LOCK:
+        # Drop the oldest entries if the cache has grown too large
+        while len(_KDTREE_CACHE) >= _KDTREE_CACHE_SIZE:
+            del _KDTREE_CACHE[next(iter(_KDTREE_CACHE))]
+        _KDTREE_CACHE[neuron] = (checksum, tree)
+
+    return tree
+
+
+def _knn(x: np.ndarray,
+         k: int,
+         workers: int = -1,
+         backend: Union[Literal['auto'],
+                        Literal['scipy'],
+                        Literal['pykdtree'],
+                        Literal['hnsw']] = 'auto',
+         tree: Optional[object] = None) -> np.ndarray:
+    """Get indices of the k nearest neighbours for each point in `x`.
+
+    Returns
+    -------
+    (N, k) array
+                Indices of the k nearest neighbours (including self-hits).
+
+    """
+    if tree is None:
+        tree = _build_kdtree(x, backend=backend, workers=workers)
+    elif getattr(tree, 'n', x.shape[0]) != x.shape[0]:
+        raise ValueError(f'KDTree has {tree.n} points but we have '
+                         f'{x.shape[0]} points')
+
+    if hnswlib and isinstance(tree, hnswlib.Index):
+        if tree.element_count != x.shape[0]:
+            raise ValueError(f'Index has {tree.element_count} points but we '
+                             f'have {x.shape[0]} points')
+        # The size of the candidate list must be at least k. Indices may
+        # be shared between threads, so we only ever increase it (and do so
+        # under a lock)
+        with _HNSW_EF_LOCK:
+            if tree.ef < k:
+                tree.set_ef(k)
+        ix, dist = tree.knn_query(x, k=k, num_threads=workers)
+    elif pyKDTree and isinstance(tree, pyKDTree):
+        # pykdtree needs the query points to have the same dtype as the tree
+        if x.dtype not in (np.float32, np.float64):
+            x = x.astype(np.float64)
+        dist, ix = tree.query(x, k=k)
+    else:
+        try:
+            dist, ix = tree.query(x, k=k, workers=workers)
+        except TypeError:
+            # scipy < 1.6 calls this parameter `n_jobs`
+            dist, ix = tree.query(x, k=k, n_jobs=workers)
+
     # This makes sure we have (N, k) shaped array even if k = 1
-    ix = ix.reshape(x.shape[0], k)
+    return ix.reshape(x.shape[0], k)
 
-    # Get points: array of (N, k, 3)
-    pt = x[ix]
 
-    # Generate centers for each cloud of k nearest neighbors
-    centers = np.mean(pt, axis=1)
+def _inertia_fused(x: np.ndarray,
+                   ix: np.ndarray,
+                   chunksize: int = 2 ** 20) -> np.ndarray:
+    """Compute inertia of the nearest-neighbour clouds.
 
-    # Generate vector from center
-    cpt = pt - centers.reshape((pt.shape[0], 1, 3))
+    Instead of generating the full (N, k, 3) array of centered points, this
+    accumulates the sums (and sums of products) of the coordinates in chunks
+    and centers afterwards via `sum(p * p.T) - k * mean * mean.T`.
 
-    # Get inertia (N, 3, 3)
-    inertia = cpt.transpose((0, 2, 1)) @ cpt
+    Parameters
+    ----------
+    x :         (N, 3) array
+                Points.
+    ix :        (N, k) array
+                Indices of the k nearest neighbours for each point.
+    chunksize : int
+                Max number of neighbour coordinates (`N * k`) to gather at a
+                time. Determines peak memory usage.
 
-    # Extract vector and alpha
-    u, s, vh = np.linalg.svd(inertia)
-    vect = vh[:, 0, :]
-    alpha = (s[:, 0] - s[:, 1]) / np.sum(s, axis=1)
+    Returns
+    -------
+    (6, N) array
+                The unique entries `xx, yy, zz, xy, xz, yz` of the symmetric
+                inertia matrices.
 
-    return core.Dotprops(points=x, alpha=alpha, vect=vect, **properties)
+    """
+    n, k = ix.shape
+    dtype = np.result_type(x, np.float32)
+    inertia = np.empty((6, n), dtype=dtype)
+    # Gathering from one contiguous array per coordinate gives contiguous
+    # (c, k) blocks which the reductions below chew through a lot faster
+    # than the strided slices of a gathered (c, k, 3) array
+    xs, ys, zs = np.array(x, dtype=dtype, order='F').T
+    step = max(1, chunksize // k)
+    for i in range(0, n, step):
+        # Fancy indexing converts the indices to intp internally - for
+        # backends that return e.g. uint32 (pykdtree) doing that once per
+        # chunk is cheaper than for each of the gathers below
+        this_ix = ix[i:i + step].astype(np.intp, copy=False)
+        ref = this_ix[:, :1]
+        # Shifting by the first neighbour does not change the inertia but
+        # avoids loss of precision when points are far from the origin
+        px = xs[this_ix]
+        px -= xs[ref]
+        py = ys[this_ix]
+        py -= ys[ref]
+        pz = zs[this_ix]
+        pz -= zs[ref]
+        mx, my, mz = px.mean(axis=1), py.mean(axis=1), pz.mean(axis=1)
+
+        ins = inertia[:, i:i + step]
+        ins[0] = np.einsum('ij,ij->i', px, px) - k * mx * mx
+        ins[1] = np.einsum('ij,ij->i', py, py) - k * my * my
+        ins[2] = np.einsum('ij,ij->i', pz, pz) - k * mz * mz
+        ins[3] = np.einsum('ij,ij->i', px, py) - k * mx * my
+        ins[4] = np.einsum('ij,ij->i', px, pz) - k * mx * mz
+        ins[5] = np.einsum('ij,ij->i', py, pz) - k * my * mz
+
+    return inertia
+
+
+def _eig3_sym(xx, yy, zz, xy, xz, yz, dtype=None) -> tuple:
+    """Closed-form eigendecomposition of symmetric PSD 3x3 matrices.
+
+    This is a vectorized version of the trigonometric solution of the
+    characteristic polynomial (Smith, 1961) and is a lot faster than
+    calling LAPACK for each of the N tiny matrices.
+
+    Parameters
+    ----------
+    xx, yy, zz, xy, xz, yz :    (N, ) arrays
+                                The unique entries of the symmetric matrices.
+    dtype :                     numpy dtype, optional
+                                Data type of the output. If not provided will
+                                use that of the input (but at least float32).
+
+    Returns
+    -------
+    vect :      (N, 3) array
+                Eigenvector for the largest eigenvalue.
+    alpha :     (N, ) array
+                `(l1 - l2) / (l1 + l2 + l3)`.
+
+    """
+    if dtype is None:
+        dtype = np.result_type(xx, np.float32)
+    # Use double precision internally - the closed-form solution is prone to
+    # cancellation errors
+    xx, yy, zz, xy, xz, yz = (np.asarray(v, dtype=np.float64)
+                              for v in (xx, yy, zz, xy, xz, yz))
+
+    # Shift the matrices by their mean eigenvalue: B = A - q * I
+    q = (xx + yy + zz) / 3
+    a, b, c = xx - q, yy - q, zz - q
+    p = np.sqrt((a ** 2 + b ** 2 + c ** 2
+                 + 2 * (xy ** 2 + xz ** 2 + yz ** 2)) / 6)
+
+    # Half the determinant of B / p scaled to [-1, 1]
+    det = (a * (b * c - yz ** 2)
+           - xy * (xy * c - yz * xz)
+           + xz * (xy * yz - b * xz))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.clip(det / (2 * p ** 3), -1, 1)
+    # If p == 0, the matrix is a multiple of the identity
+    r[~np.isfinite(r)] = 0
+
+    phi = np.arccos(r) / 3
+    l1 = q + 2 * p * np.cos(phi)
+    l3 = q + 2 * p * np.cos(phi + 2 * np.pi / 3)
+    l2 = 3 * q - l1 - l3
+    # The matrices are positive semi-definite: clip rounding errors
+    l2, l3 = np.maximum(l2, 0), np.maximum(l3, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = (l1 - l2) / (l1 + l2 + l3)
+
+    # The eigenvector for l1 is orthogonal to the rows of (A - l1 * I), i.e.
+    # parallel to the cross product of any two (linearly independent) rows
+    r0 = np.stack((xx - l1, xy, xz), axis=1)
+    r1 = np.stack((xy, yy - l1, yz), axis=1)
+    r2 = np.stack((xz, yz, zz - l1), axis=1)
+    cands = np.stack((np.cross(r0, r1), np.cross(r0, r2), np.cross(r1, r2)),
+                     axis=1)
+    norms = np.linalg.norm(cands, axis=2)
+    best = np.argmax(norms, axis=1)
+    ix = np.arange(len(best))
+    vect = cands[ix, best]
+    norm = norms[ix, best]
+
+    # If all cross products vanish, l1 is degenerate and any vector in its
+    # eigenspace will do -> fall back to the x-axis (like an SVD would)
+    degen = norm <= np.finfo(np.float64).eps * l1 ** 2
+    vect[degen] = (1, 0, 0)
+    norm[degen] = 1
+    vect /= norm.reshape(-1, 1)
+
+    return vect.astype(dtype, copy=False), alpha.astype(dtype, copy=False)
 
 
 def to_neuron_space(units: Union[int, float, pint.Quantity, pint.Unit],
@@ -270,12 +678,15 @@ def to_neuron_space(units: Union[int, float, pint.Quantity, pint.Unit],
 
     # If string, convert to units
     if isinstance(units, str):
-        units = pint.Quantity(units)
+        units = _parse_units(units)
     # If not a pint object (i.e. just a number)
     elif not isinstance(units, (pint.Quantity, pint.Unit)):
         return units
 
-    if neuron.units.dimensionless:
+    # Note that `neuron.units` is re-generated from a string on every access
+    neuron_units = neuron.units
+
+    if neuron_units.dimensionless:
         if on_error == 'raise':
             raise ValueError(f'Unable to convert "{str(units)}": Neuron units '
                              'unknown or dimensionless.')
@@ -285,7 +696,7 @@ def to_neuron_space(units: Union[int, float, pint.Quantity, pint.Unit],
     if not neuron.is_isometric:
         if on_error == 'raise':
             raise ValueError(f'Unable to convert "{str(units)}": neuron is not '
-                             'isometric ({neuron.units}).')
+                             f'isometric ({neuron_units}).')
         else:
             return units
 
@@ -293,11 +704,12 @@ def to_neuron_space(units: Union[int, float, pint.Quantity, pint.Unit],
     if units.dimensionless:
         return units.magnitude
 
-    # First convert to same unit as neuron units
-    units = units.to(neuron.units)
+    if isinstance(units, pint.Unit):
+        units = 1 * units
 
-    # Now convert magnitude
-    mag = units.magnitude / neuron.units.magnitude
+    # The conversion factor only depends on the units, not the magnitude
+    mag = units.magnitude * _conversion_factor(str(units.units),
+                                               str(neuron_units))
 
     # Rounding may not be exactly kosher but it avoids floating point issues
     # like 124.9999999999999 instead of 125
@@ -306,11 +718,40 @@ def to_neuron_space(units: Union[int, float, pint.Quantity, pint.Unit],
     return utils.round_smart(mag)
 
 
+def _parse_units(units: str) -> pint.Quantity:
+    """Parse units from string.
+
+    Parsing with pint is comparatively slow, so we cache the results. Note
+    that we always return a new Quantity since those can be modified in-place.
+    """
+    return pint.Quantity(*_parse_units_cached(units))
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_units_cached(units: str) -> tuple:
+    """Parse units from string into (magnitude, units)."""
+    q = pint.Quantity(units)
+    return q.magnitude, q.units
+
+
+@functools.lru_cache(maxsize=128)
+def _conversion_factor(units: str, neuron_units: str) -> float:
+    """Get factor to convert one `units` to multiples of `neuron_units`."""
+    neuron_units = _parse_units(neuron_units)
+    return (pint.Quantity(1, units).to(neuron_units.units).magnitude
+            / neuron_units.magnitude)
+
+
 class NeuronProcessor:
     """Apply function across all neurons of a neuronlist.
 
     This assumes that the first argument for the function accepts a single
     neuron.
+
+    With `parallel=True`, `backend` determines whether neurons are processed
+    in separate processes (via `pathos`) or threads. Threads avoid the overhead
+    of pickling neurons but only make sense for functions that release the
+    GIL for most of their runtime.
     """
 
     def __init__(self,
@@ -323,7 +764,12 @@ class NeuronProcessor:
                  warn_inplace: bool = True,
                  omit_failures: bool = False,
                  exclude_zip: list = [],
-                 desc: Optional[str] = None):
+                 desc: Optional[str] = None,
+                 backend: Union[Literal['process'],
+                                Literal['thread']] = 'process'):
+        utils.eval_param(backend, name='backend',
+                         allowed_values=('process', 'thread'))
+
         if utils.is_iterable(function):
             if len(function) != len(nl):
                 raise ValueError('Number of functions must match neurons.')
@@ -345,39 +791,43 @@ class NeuronProcessor:
         self.warn_inplace = warn_inplace
         self.exclude_zip = exclude_zip
         self.omit_failures = omit_failures
+        self.backend = backend
 
         # This makes sure that help and name match the functions being called
         functools.update_wrapper(self, self.function)
 
+    def _needs_zip(self, key, value, n_neurons):
+        """Check if argument has to be zipped with the neurons."""
+        if key in self.exclude_zip:
+            return False
+        return utils.is_iterable(value) and len(value) == n_neurons
+
     def __call__(self, *args, **kwargs):
         # Explicitly providing these parameters overwrites defaults
         parallel = kwargs.pop('parallel', self.parallel)
         n_cores = kwargs.pop('n_cores', self.n_cores)
+        chunksize = kwargs.pop('chunksize', self.chunksize)
 
         # We will check, for each argument, if it matches the number of
         # functions to run. If they it does, we will zip the values
         # with the neurons
-        parsed_args = []
-        parsed_kwargs = []
-
-        for i, n in enumerate(self.nl):
-            parsed_args.append([])
-            parsed_kwargs.append({})
-            for k, a in enumerate(args):
-                if k in self.exclude_zip:
-                    parsed_args[i].append(a)
-                elif not utils.is_iterable(a) or len(a) != len(self.nl):
-                    parsed_args[i].append(a)
-                else:
-                    parsed_args[i].append(a[i])
+        n_neurons = len(self.nl)
+        zip_args = [self._needs_zip(k, a, n_neurons) for k, a in enumerate(args)]
+        zip_kwargs = {k: self._needs_zip(k, v, n_neurons) for k, v in kwargs.items()}
 
-            for k, v in kwargs.items():
-                if k in self.exclude_zip:
-                    parsed_kwargs[i][k] = v
-                elif not utils.is_iterable(v) or len(v) != len(self.nl):
-                    parsed_kwargs[i][k] = v
-                else:
-                    parsed_kwargs[i][k] = v[i]
+        if any(zip_args):
+            parsed_args = [[a[i] if z else a for a, z in zip(args, zip_args)]
+                           for i in range(n_neurons)]
+        else:
+            # If nothing needs zipping, all neurons can share the same args
+            parsed_args = [args] * n_neurons
+
+        if any(zip_kwargs.values()):
+            parsed_kwargs = [{k: v[i] if zip_kwargs[k] else v for k, v in kwargs.items()}
+                             for i in range(n_neurons)]
+        else:
+            # If nothing needs zipping, all neurons can share the same kwargs
+            parsed_kwargs = [kwargs] * n_neurons
 
         # Silence loggers (except Errors)
         level = logger.getEffectiveLevel()
@@ -386,7 +836,25 @@ class NeuronProcessor:
             logger.setLevel('WARNING')
 
         # Apply function
-        if parallel:
+        if parallel and self.backend == 'thread':
+            # Threads share memory -> no need to pickle neurons and
+            # `inplace=True` works as expected
+            with ThreadPoolExecutor(n_cores) as pool:
+                combinations = list(zip(self.funcs,
+                                        parsed_args,
+                                        parsed_kwargs))
+
+                if not self.omit_failures:
+                    wrapper = _call
+                else:
+                    wrapper = _try_call
+
+                res = list(config.tqdm(pool.map(wrapper, combinations),
+                                       total=len(combinations),
+                                       desc=self.desc,
+                                       disable=config.pbar_hide or not self.progress,
+                                       leave=config.pbar_leave))
+        elif parallel:
             if not ProcessingPool:
                 raise ImportError('navis relies on pathos for multiprocessing!'
                                   'Please install pathos and try again:\n'
@@ -400,7 +868,6 @@ class NeuronProcessor:
                 combinations = list(zip(self.funcs,
                                         parsed_args,
                                         parsed_kwargs))
-                chunksize = kwargs.pop('chunksize', self.chunksize)  # max(int(len(combinations) / 100), 1)
 
                 if not self.omit_failures:
                     wrapper = _call
@@ -444,12 +911,19 @@ class NeuronProcessor:
             failed_ids = self.nl.id[np.where(failed)].astype(str)
             logger.debug(f'The following IDs failed to complete: {", ".join(failed_ids)}')
 
+        # Check if results are all neurons or all None in a single pass
+        all_neurons = all_none = True
+        for r in res:
+            all_neurons = all_neurons and isinstance(r, (core.NeuronList, core.BaseNeuron))
+            all_none = all_none and r is None
+            if not all_neurons and not all_none:
+                break
+
         # If result is a list of neurons, combine them back into a single list
-        is_neuron = [isinstance(r, (core.NeuronList, core.BaseNeuron)) for r in res]
-        if all(is_neuron):
+        if all_neurons:
             return self.nl.__class__(utils.unpack_neurons(res))
         # If results are all None return nothing instead of a list of [None, ..]
-        if np.all([r is None for r in res]):
+        if all_none:
             res = None
         # If not all neurons simply return results and let user deal with it
         return res
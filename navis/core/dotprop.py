@@ -493,25 +493,16 @@ class Dotprops(BaseNeuron):
             raise ValueError(f"Too few points ({n_points}) to calculate {k} "
                              "nearest-neighbors")
 
-        # Create the KDTree and get the k-nearest neighbors for each point
-        dist, ix = self.kdtree.query(x.points, k=k)
+        # Get the k-nearest neighbors for each point
+        ix = core.core_utils._knn(x.points, k=k, tree=self.kdtree)
 
-        # Get points: array of (N, k, 3)
-        pt = x.points[ix]
-
-        # Generate centers for each cloud of k nearest neighbors
-        centers = np.mean(pt, axis=1)
-
-        # Generate vector from center
-        cpt = pt - centers.reshape((pt.shape[0], 1, 3))
-
-        # Get inertia (N, 3, 3)
-        inertia = cpt.transpose((0, 2, 1)) @ cpt
+        # Get the (unique entries of the) inertia for each point's
+        # neighbourhood without generating the (N, k, 3) centered points
+        inertia = core.core_utils._inertia_fused(x.points, ix)
 
         # Extract vector and alpha
-        u, s, vh = np.linalg.svd(inertia)
-        x.vect = vh[:, 0, :]
-        x.alpha = (s[:, 0] - s[:, 1]) / np.sum(s, axis=1)
+        dtype = np.result_type(x.points, np.float32)
+        x.vect, x.alpha = core.core_utils._eig3_sym(*inertia, dtype=dtype)
 
         # Keep track of k
         x.k = k
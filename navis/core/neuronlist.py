@@ -12,6 +12,7 @@
 #    GNU General Public License for more details.
 
 from concurrent.futures import ThreadPoolExecutor
+import inspect
 import os
 import random
 import re
@@ -22,10 +23,12 @@ import networkx as nx
 
 import numpy as np
 import pandas as pd
+import pint
 
 from pathlib import Path
 from typing import (Sequence, Union, Iterable, List,
                     Optional, Callable, Iterator)
+from typing_extensions import Literal
 
 from .. import utils, config, core
 
@@ -588,6 +591,8 @@ class NeuronList:
               parallel: bool = False,
               n_cores: int = os.cpu_count() // 2,
               omit_failures: bool = False,
+              parallel_backend: Union[Literal['process'],
+                                      Literal['thread']] = 'process',
               **kwargs):
         """Apply function across all neurons in this NeuronList.
 
@@ -606,6 +611,13 @@ class NeuronList:
                         half the available cores.
         omit_failures : bool
                         If True, will ignore failures.
+        parallel_backend : "process" | "thread"
+                        Whether to use multiple processes (via `pathos`) or
+                        threads if `parallel=True`. Threads don't need to copy
+                        the neurons and hence have less overhead but they only
+                        help if `func` releases the GIL (e.g. most numpy/scipy
+                        operations or I/O). If `func` has a `workers`
+                        parameter, threads will default to `workers=1`.
 
         **kwargs
                     Will be passed to function.
@@ -620,11 +632,23 @@ class NeuronList:
         >>> nl = navis.example_neurons()
         >>> # Apply resampling function
         >>> nl_rs = nl.apply(navis.resample_skeleton, resample_to=1000, inplace=False)
+        >>> # Use threads instead of processes
+        >>> dps = nl.apply(navis.make_dotprops, k=5, parallel=True, n_cores=2,
+        ...                parallel_backend='thread')
 
         """
         if not callable(func):
             raise TypeError('"func" must be callable')
 
+        # Threads that are themselves multi-threaded (e.g. KDTree
+        # queries) would oversubscribe the cores
+        if parallel and parallel_backend == 'thread' and 'workers' not in kwargs:
+            try:
+                if 'workers' in inspect.signature(func).parameters:
+                    kwargs['workers'] = 1
+            except (TypeError, ValueError):
+                pass
+
         # Delayed import to avoid circular import
         from .core_utils import NeuronProcessor
         proc = NeuronProcessor(self,
@@ -632,10 +656,79 @@ class NeuronList:
                                parallel=parallel,
                                n_cores=n_cores,
                                omit_failures=omit_failures,
+                               backend=parallel_backend,
                                desc=f'Apply {func.__name__}')
 
         return proc(self.neurons, **kwargs)
 
+    def map_units(self,
+                  units: Union[pint.Unit, str],
+                  on_error: Union[Literal['raise'],
+                                  Literal['ignore']] = 'raise') -> list:
+        """Convert units to match each neuron's space.
+
+        Neurons typically share the same units, so instead of converting
+        for each neuron individually, we do it once for each unique unit.
+
+        Parameters
+        ----------
+        units :     number | str | pint.Quantity | pint.Units | list thereof
+                    The units to convert to neuron units. Simple numbers are
+                    just passed through. If a list with one value per
+                    neuron, will convert those one-to-one.
+        on_error :  "raise" | "ignore"
+                    What to do if an error occurs (e.g. because a neuron does
+                    not have units specified). If "ignore" will simply return
+                    `units` unchanged.
+
+        Returns
+        -------
+        list
+                    One converted value for each neuron.
+
+        See Also
+        --------
+        [`navis.to_neuron_space`][]
+                    The base function for this method.
+
+        Examples
+        --------
+        >>> import navis
+        >>> nl = navis.example_neurons(3)
+        >>> nl.map_units('1 nanometer')
+        [0.125, 0.125, 0.125]
+        >>> nl.map_units(['1 nanometer', '2 nanometer', '3 nanometer'])
+        [0.125, 0.25, 0.375]
+
+        """
+        if utils.is_iterable(units) and len(units) == len(self):
+            values = list(units)
+        else:
+            values = [units] * len(self)
+
+        # Group neurons by their units (and the value to convert)
+        converted = {}
+        out = []
+        for n, v in zip(self.neurons, values):
+            key = (getattr(n, '_unit_str', None), v)
+            try:
+                out.append(converted[key])
+                continue
+            except KeyError:
+                pass
+            except TypeError:
+                # Unhashable values (e.g. arrays) are converted individually
+                key = None
+
+            conv = core.core_utils.to_neuron_space(v,
+                                                   neuron=n,
+                                                   on_error=on_error)
+            if key is not None:
+                converted[key] = conv
+            out.append(conv)
+
+        return out
+
     def sum(self) -> pd.DataFrame:
         """Return sum numeric and boolean values over all neurons."""
         return self.summary().sum(numeric_only=True)
@@ -38,7 +38,9 @@ from .iterables import is_iterable, make_iterable
 def map_neuronlist(desc: str = "",
                    can_zip: List[Union[str, int]] = [],
                    must_zip: List[Union[str, int]] = [],
-                   allow_parallel: bool = False):
+                   allow_parallel: bool = False,
+                   backend: Union[Literal['process'],
+                                  Literal['thread']] = 'process'):
     """Decorate function to run on all neurons in the NeuronList.
 
     This also updates the docstring.
@@ -76,6 +78,10 @@ def map_neuronlist(desc: str = "",
                      If True and the function is called with `parallel=True`,
                      will use multiple cores to process the neuronlist. Number
                      of cores a can be set using `n_cores` keyword argument.
+    backend :        "process" | "thread"
+                     Whether to use multiple processes or threads for parallel
+                     processing. Use "thread" only if the function releases
+                     the GIL for most of its runtime.
 
     """
     # TODO:
@@ -161,13 +167,23 @@ def map_neuronlist(desc: str = "",
                     # All things failing assume it's not inplace
                     inplace = False
 
-                if parallel and 'inplace' in sig.parameters:
+                # Threads share memory, so this only applies to processes
+                if parallel and backend == 'process' and 'inplace' in sig.parameters:
                     kwargs['inplace'] = True
 
+                # Threads that are themselves multi-threaded (e.g. KDTree
+                # queries) would oversubscribe the cores
+                if (parallel and backend == 'thread'
+                        and 'workers' in sig.parameters
+                        and 'workers' not in kwargs):
+                    kwargs['workers'] = 1
+
                 # Prepare processor
                 n_cores = kwargs.pop('n_cores', os.cpu_count() // 2)
                 chunksize = kwargs.pop('chunksize', 1)
-                excl = list(kwargs.keys()) + list(range(1, len(args) + 1))
+                # Only `can_zip` and `must_zip` arguments are zipped
+                excl = [p for p in kwargs if p not in can_zip + must_zip]
+                excl += list(range(1, len(args) + 1))
                 proc = core.NeuronProcessor(nl, function,
                                             parallel=parallel,
                                             desc=desc,
@@ -176,7 +192,8 @@ def map_neuronlist(desc: str = "",
                                             omit_failures=kwargs.pop('omit_failures', False),
                                             chunksize=chunksize,
                                             exclude_zip=excl,
-                                            n_cores=n_cores)
+                                            n_cores=n_cores,
+                                            backend=backend)
                 # Apply function
                 res = proc(nl, *args, **kwargs)
 
@@ -194,7 +211,8 @@ def map_neuronlist(desc: str = "",
                 return function(*args, **kwargs)
 
         # Update the docstring
-        wrapper = map_neuronlist_update_docstring(wrapper, allow_parallel)
+        wrapper = map_neuronlist_update_docstring(wrapper, allow_parallel,
+                                                  backend=backend)
 
         return wrapper
 
@@ -313,7 +331,7 @@ def map_neuronlist_df(desc: str = "",
     return decorator
 
 
-def map_neuronlist_update_docstring(func, allow_parallel):
+def map_neuronlist_update_docstring(func, allow_parallel, backend='process'):
     """Add additional parameters to docstring of function."""
     # Parse docstring
     lines = func.__doc__.split('\n')
@@ -331,10 +349,14 @@ def map_neuronlist_update_docstring(func, allow_parallel):
 
     msg = ''
     if allow_parallel:
+        if backend == 'thread':
+            requires = 'Uses threads.'
+        else:
+            requires = 'Requires `pathos`.'
         msg += dedent(f"""\
         parallel :{" " * (offset - 10)}bool
                   {" " * (offset - 10)}If True and input is NeuronList, use parallel
-                  {" " * (offset - 10)}processing. Requires `pathos`.
+                  {" " * (offset - 10)}processing. {requires}
         n_cores : {" " * (offset - 10)}int, optional
                   {" " * (offset - 10)}Numbers of cores to use if `parallel=True`.
                   {" " * (offset - 10)}Defaults to half the available cores.
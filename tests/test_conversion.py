@@ -0,0 +1,61 @@
+import navis
+import pytest
+
+import numpy as np
+
+
+def _voxel_tangents(pts, ix, shape):
+    """Reference implementation of per-voxel vectors/alphas using SVD."""
+    vects = np.zeros(tuple(shape) + (3, ))
+    alph = np.zeros(shape)
+    for v in np.unique(ix, axis=0):
+        if np.any(v < 0) or np.any(v >= shape):
+            continue
+        pt = pts[np.all(ix == v, axis=1)]
+        cpt = pt - pt.mean(axis=0)
+        u, s, vh = np.linalg.svd(cpt.T @ cpt)
+        vects[tuple(v)] = vh[0]
+        if len(pt) > 1:
+            alph[tuple(v)] = (s[0] - s[1]) / s.sum()
+    return vects, alph
+
+
+@pytest.mark.parametrize("bounds", [None, [[2, 8], [2, 8], [2, 8]]])
+def test_neuron2voxels_vectors(bounds):
+    # Scatter a few points around a set of voxel centers - some voxels will
+    # end up with only a single point
+    rng = np.random.default_rng(1985)
+    centers = rng.integers(0, 11, size=(50, 3))
+    counts = rng.integers(1, 7, size=len(centers))
+    pts = np.repeat(centers, counts, axis=0)
+    pts = pts + rng.uniform(-.4, .4, size=pts.shape)
+    dp = navis.Dotprops(pts, k=None, units='1 nm')
+
+    vx = navis.conversion.neuron2voxels(dp, pitch=1, bounds=bounds,
+                                        vectors=True, alphas=True)
+
+    # Voxel indices relative to the lower bounds
+    lower = dp.bbox[:, 0] if bounds is None else np.asarray(bounds)[:, 0]
+    ix = pts.round().astype(int) - lower.round().astype(int)
+    vects, alph = _voxel_tangents(pts, ix, vx.grid.shape)
+
+    assert vx.vectors.shape == vx.grid.shape + (3, )
+    assert vx.alphas.shape == vx.grid.shape
+    assert np.allclose(vx.alphas, alph, atol=1e-5)
+    # Vectors are only defined up to their sign
+    dot = np.abs((vx.vectors * vects).sum(axis=-1))
+    filled = np.any(vects != 0, axis=-1)
+    assert np.allclose(dot[filled], 1, atol=1e-5)
+    assert np.all(vx.vectors[~filled] == 0)
+
+    # Single-point voxels have alpha 0 and vector (1, 0, 0)
+    vxl, cnt = np.unique(ix, axis=0, return_counts=True)
+    is_in = np.all((vxl >= 0) & (vxl < vx.grid.shape), axis=1)
+    single = vxl[is_in & (cnt == 1)]
+    assert len(single)
+    assert np.all(vx.alphas[tuple(single.T)] == 0)
+    assert np.all(vx.vectors[tuple(single.T)] == (1, 0, 0))
+
+    # With smaller bounds some points are outside the grid
+    if bounds is not None:
+        assert not np.all(is_in)
@@ -0,0 +1,204 @@
+import navis
+import pytest
+
+import numpy as np
+
+
+def _svd_tangents(cpt):
+    """Reference implementation of tangent vectors/alpha using SVD."""
+    inertia = cpt.transpose((0, 2, 1)) @ cpt
+    u, s, vh = np.linalg.svd(inertia)
+    return vh[:, 0, :], (s[:, 0] - s[:, 1]) / np.sum(s, axis=1)
+
+
+@pytest.mark.parametrize("k", [2, 5, 20])
+@pytest.mark.parametrize("chunksize", [100, 2 ** 20])
+def test_dotprops_tangents(k, chunksize):
+    rng = np.random.default_rng(1985)
+    pts = rng.normal(size=(1000, 3)) * [5, 1, .2] + 1e5
+    ix = rng.integers(0, len(pts), size=(len(pts), k))
+
+    inertia = navis.core.core_utils._inertia_fused(pts, ix, chunksize=chunksize)
+    vect, alpha = navis.core.core_utils._eig3_sym(*inertia)
+
+    pt = pts[ix]
+    vect_ref, alpha_ref = _svd_tangents(pt - pt.mean(axis=1, keepdims=True))
+
+    assert vect.shape == (1000, 3)
+    assert np.allclose(np.linalg.norm(vect, axis=1), 1)
+    # Vectors are only defined up to their sign
+    assert np.allclose(np.abs((vect * vect_ref).sum(axis=1)), 1)
+    assert np.allclose(alpha, alpha_ref)
+
+
+def test_make_dotprops():
+    n = navis.example_neurons(1, kind='skeleton')
+    dp = navis.make_dotprops(n, k=5)
+
+    assert isinstance(dp, navis.Dotprops)
+    assert dp.points.shape == (n.n_nodes, 3)
+    assert dp.vect.shape == (n.n_nodes, 3)
+    assert dp.alpha.shape == (n.n_nodes, )
+    assert np.all((dp.alpha >= 0) & (dp.alpha <= 1))
+
+
+def test_recalculate_tangents():
+    # Use random points to avoid ties among the nearest neighbours
+    rng = np.random.default_rng(1985)
+    dp = navis.make_dotprops(rng.random((1000, 3)), k=5)
+    dp2 = dp.recalculate_tangents(k=5, inplace=False)
+
+    assert np.allclose(np.abs((dp.vect * dp2.vect).sum(axis=1)), 1)
+    assert np.allclose(dp.alpha, dp2.alpha)
+
+
+def test_kdtree_backends():
+    pytest.importorskip('pykdtree')
+
+    # Use random points to avoid ties among the nearest neighbours
+    rng = np.random.default_rng(1985)
+    pts = rng.random((1000, 3))
+    dp1 = navis.make_dotprops(pts, k=5, kdtree_backend='scipy')
+    dp2 = navis.make_dotprops(pts, k=5, kdtree_backend='pykdtree')
+
+    assert np.allclose(np.abs((dp1.vect * dp2.vect).sum(axis=1)), 1)
+    assert np.allclose(dp1.alpha, dp2.alpha)
+
+
+def test_kdtree_backend_hnsw():
+    pytest.importorskip('hnswlib')
+
+    rng = np.random.default_rng(1985)
+    pts = rng.random((1000, 3))
+    dp1 = navis.make_dotprops(pts, k=5, kdtree_backend='scipy')
+    dp2 = navis.make_dotprops(pts, k=5, kdtree_backend='hnsw')
+
+    # Approximate neighbours -> allow for the odd miss
+    same = np.isclose(dp1.alpha, dp2.alpha)
+    assert same.mean() > 0.95
+
+
+def test_kdtree_backend_hnsw_shared_index():
+    pytest.importorskip('hnswlib')
+
+    rng = np.random.default_rng(1985)
+    pts = rng.random((1000, 3)).astype(np.float32)
+    index = navis.core.core_utils._build_kdtree(pts, backend='hnsw', workers=1)
+    assert index.ef == 50
+
+    # The candidate list is increased for large k but never decreased
+    _ = navis.make_dotprops(pts, k=60, tree=index)
+    assert index.ef == 60
+    _ = navis.make_dotprops(pts, k=5, tree=index)
+    assert index.ef == 60
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64, None])
+def test_dotprops_dtype(dtype):
+    rng = np.random.default_rng(1985)
+    pts = rng.random((1000, 3))
+    dp = navis.make_dotprops(pts, k=5, dtype=dtype)
+
+    expected = dtype if dtype else pts.dtype
+    assert dp.points.dtype == expected
+    assert dp.vect.dtype == expected
+    assert dp.alpha.dtype == expected
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_dotprops_dtype_tangents(dtype):
+    n = navis.example_neurons(1, kind='skeleton')
+    dp = navis.make_dotprops(n, k=None, dtype=dtype)
+
+    assert dp.points.dtype == dtype
+    assert dp.vect.dtype == dtype
+
+
+def test_dotprops_owns_points():
+    rng = np.random.default_rng(1985)
+    pts = rng.random((1000, 3)).astype(np.float32)
+    dp = navis.make_dotprops(pts, k=5)
+    assert not np.shares_memory(dp.points, pts)
+
+    dp2 = navis.make_dotprops(dp, k=5)
+    assert not np.shares_memory(dp2.points, dp.points)
+
+    m = navis.example_neurons(1, kind='mesh')
+    dp3 = navis.make_dotprops(m, k=5, dtype=None)
+    assert not np.shares_memory(dp3.points, m.vertices)
+
+
+def test_dotprops_kdtree_reuse():
+    from scipy.spatial import cKDTree
+
+    rng = np.random.default_rng(1985)
+    pts = rng.random((1000, 3)).astype(np.float32)
+    tree = cKDTree(pts)
+
+    dp1 = navis.make_dotprops(pts, k=5)
+    dp2 = navis.make_dotprops(pts, k=5, tree=tree)
+    assert np.allclose(dp1.alpha, dp2.alpha)
+
+    with pytest.raises(ValueError):
+        navis.make_dotprops(pts[:500], k=5, tree=tree)
+
+
+def test_dotprops_kdtree_neuronlist():
+    from scipy.spatial import cKDTree
+
+    nl = navis.example_neurons(2, kind='skeleton')
+    pts = [n.nodes[['x', 'y', 'z']].values.astype(np.float32) for n in nl]
+    trees = [cKDTree(p) for p in pts]
+
+    # One tree per neuron is zipped with the neurons
+    dp1 = navis.make_dotprops(nl, k=5)
+    dp2 = navis.make_dotprops(nl, k=5, tree=trees)
+    for d1, d2 in zip(dp1, dp2):
+        assert np.allclose(d1.alpha, d2.alpha)
+
+    # A single tree can't be used for multiple neurons
+    with pytest.raises(ValueError, match='values of `tree`'):
+        navis.make_dotprops(nl, k=5, tree=trees[0])
+
+
+def test_dotprops_kdtree_cache(monkeypatch):
+    core_utils = navis.core.core_utils
+    build = core_utils._build_kdtree
+    calls = []
+
+    def _build_kdtree(*args, **kwargs):
+        calls.append(1)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(core_utils, '_build_kdtree', _build_kdtree)
+
+    # KDTrees are not cached by default
+    n = navis.example_neurons(1, kind='skeleton')
+    for k in (5, 10):
+        _ = navis.make_dotprops(n, k=k)
+    assert len(calls) == 2
+    assert n not in core_utils._KDTREE_CACHE
+
+    # Cached trees are reused for the same points
+    calls.clear()
+    for k in (5, 10):
+        _ = navis.make_dotprops(n, k=k, cache_tree=True)
+    assert len(calls) == 1
+    assert n in core_utils._KDTREE_CACHE
+
+    # ... but not if the points differ
+    _ = navis.make_dotprops(n, k=5, dtype=np.float64, cache_tree=True)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_dotprops_kdtree_cache_inplace(dtype):
+    n = navis.example_neurons(1, kind='skeleton')
+
+    # Modifying the dotprops in-place must not affect the cached tree
+    dp = navis.make_dotprops(n, k=5, dtype=dtype, cache_tree=True)
+    dp /= 125
+
+    dp1 = navis.make_dotprops(n, k=10, dtype=dtype, cache_tree=True)
+    dp2 = navis.make_dotprops(n, k=10, dtype=dtype)
+    assert np.allclose(dp1.alpha, dp2.alpha)
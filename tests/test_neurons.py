@@ -27,3 +27,39 @@ def test_from_swc_multi(swc_source_multi, parallel):
 def test_from_gml():
     n = navis.example_neurons(n=1, source='gml')
     assert isinstance(n, navis.TreeNeuron)
+
+
+def test_map_units():
+    nl = navis.example_neurons(3)
+
+    # Single value is broadcast to all neurons
+    assert nl.map_units('1 nanometer') == [0.125, 0.125, 0.125]
+    assert nl.map_units(2) == [2, 2, 2]
+
+    # One value per neuron is mapped one-to-one
+    conv = nl.map_units(['1 nanometer', '2 nanometer', '3 nanometer'])
+    assert conv == [0.125, 0.25, 0.375]
+
+
+def test_to_neuron_space_cache():
+    n = navis.example_neurons(1)
+    core_utils = navis.core.core_utils
+    core_utils._conversion_factor.cache_clear()
+
+    # The cached conversion factor does not depend on the magnitude
+    for i in range(1, 5):
+        assert navis.core.to_neuron_space(f'{i} nm', n) == i * 0.125
+    assert core_utils._conversion_factor.cache_info().currsize == 1
+
+
+def test_to_neuron_space_fresh_quantity():
+    # Without units, the parsed quantity is returned as is
+    n = navis.core.BaseNeuron()
+    q1 = navis.core.to_neuron_space('1 nm', n, on_error='ignore')
+    q1.ito('um')
+
+    # In-place modifications must not leak into later calls
+    q2 = navis.core.to_neuron_space('1 nm', n, on_error='ignore')
+    assert q2 is not q1
+    assert str(q2.units) == 'nanometer'
+    assert q2.magnitude == 1
@@ -62,3 +62,70 @@ def test_apply():
     assert isinstance(pr, navis.NeuronList)
     assert len(pr) == len(nl)
     assert all(pr.n_nodes == nl.n_nodes)
+
+
+def test_parallel_threads(monkeypatch):
+    # Record the number of workers used for the KDTree queries
+    core_utils = navis.core.core_utils
+    knn = core_utils._knn
+    workers = []
+
+    def _knn(*args, **kwargs):
+        workers.append(kwargs['workers'])
+        return knn(*args, **kwargs)
+
+    monkeypatch.setattr(core_utils, '_knn', _knn)
+
+    # Load example neurons
+    nl = navis.example_neurons(kind='skeleton')
+
+    # make_dotprops uses threads instead of processes
+    dp = navis.make_dotprops(nl, k=5, parallel=True, n_cores=2)
+    assert isinstance(dp, navis.NeuronList)
+    assert len(dp) == len(nl)
+    assert all(dp.id == nl.id)
+    assert all(dp.n_points == nl.n_nodes)
+
+    # Each thread should use a single worker unless told otherwise
+    assert workers == [1] * len(nl)
+    workers.clear()
+    _ = navis.make_dotprops(nl, k=5, parallel=True, n_cores=2, workers=2)
+    assert workers == [2] * len(nl)
+
+
+def test_apply_threads():
+    # Load example neurons
+    nl = navis.example_neurons(kind='skeleton')
+
+    # Test apply using threads
+    ids = nl.apply(lambda x: x.id, parallel=True, n_cores=2, parallel_backend='thread')
+    assert isinstance(ids, list)
+    assert all(np.array(ids) == nl.id)
+
+    # With threads, inplace=True works as expected
+    pr = nl.copy()
+    _ = pr.apply(navis.prune_by_strahler, to_prune=1, inplace=True,
+                 parallel=True, n_cores=2, parallel_backend='thread')
+    assert all(pr.n_nodes < nl.n_nodes)
+
+
+def test_apply_passes_backend():
+    # Load example neurons
+    nl = navis.example_neurons(kind='skeleton')
+
+    # `backend` is not consumed by apply but passed through to the function
+    def get_backend(x, backend=None):
+        return backend
+
+    assert nl.apply(get_backend, backend='x') == ['x'] * len(nl)
+    assert nl.apply(get_backend, backend='x', parallel=True, n_cores=2,
+                    parallel_backend='thread') == ['x'] * len(nl)
+
+    # Threads default to a single worker for functions that accept `workers`
+    def get_workers(x, workers=-1):
+        return workers
+
+    assert nl.apply(get_workers, parallel=True, n_cores=2,
+                    parallel_backend='thread') == [1] * len(nl)
+    assert nl.apply(get_workers, parallel=True, n_cores=2, workers=2,
+                    parallel_backend='thread') == [2] * len(nl)